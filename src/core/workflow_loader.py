@@ -7,15 +7,16 @@ Defines the pydantic models for steps/selectors and loads YAML workflows,
 including basic normalization for legacy formats and multi-doc files.
 """
 
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Annotated, Literal, Optional, Union
+from typing import Annotated, Callable, Literal, Optional, Union
 import os
 import re
 
 import yaml
 from pydantic import BaseModel, Field, ValidationError, field_validator
-from pydantic.functional_validators import BeforeValidator
+from pydantic.functional_validators import AfterValidator, BeforeValidator
 
 from src.utils.config import get_settings
 
@@ -23,12 +24,40 @@ from src.utils.config import get_settings
 # ---------- Helpers ----------
 
 
-def _to_abs_path(p: str | Path) -> Path:
-    pth = Path(p) if not isinstance(p, Path) else p
-    return pth if pth.is_absolute() else Path.cwd() / pth
+# Resolved once; relative workflow paths are anchored here (see reset_cwd)
+_CWD = Path.cwd()
 
 
-AbsPath = Annotated[Path, BeforeValidator(_to_abs_path)]
+def reset_cwd() -> None:
+    """Re-read the working directory used to absolutize relative paths (call after os.chdir)."""
+    global _CWD
+    _CWD = Path.cwd()
+
+
+def _to_abs_path(p: Path) -> Path:
+    return p if p.is_absolute() else _CWD / p
+
+
+# After-validator: pydantic parses str -> Path first, which JSON-mode validation requires
+AbsPath = Annotated[Path, AfterValidator(_to_abs_path)]
+
+
+def _strip_non_empty(v: str) -> str:
+    v = v.strip()
+    if not v:
+        raise ValueError("value cannot be empty")
+    return v
+
+
+def _abs_http_url(v: str) -> str:
+    v = v.strip()
+    if not v.startswith("http"):
+        raise ValueError("must be an absolute http(s) URL")
+    return v
+
+
+NonEmptyStr = Annotated[str, AfterValidator(_strip_non_empty)]
+AbsHttpUrl = Annotated[str, AfterValidator(_abs_http_url)]
 
 
 # ---------- Core enums ----------
@@ -64,18 +93,63 @@ class ActionName(str, Enum):
 # ---------- Shared tiny models ----------
 
 
-class Selector(BaseModel):
-    value: str = Field(..., description="Selector string (css/text/role/xpath)")
-    strategy: SelectorStrategy = Field(default=SelectorStrategy.css)
-    timeout_ms: int = Field(default=5000, ge=0)
-
-    @field_validator("value")
-    @classmethod
-    def _non_empty(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("selector.value cannot be empty")
+@dataclass(frozen=True, slots=True)
+class Selector:
+    """
+    Selector string (css/text/role/xpath) plus its strategy and timeout.
+    A plain slotted dataclass: steps hold one each, so it stays cheap to build.
+    """
+    value: str
+    strategy: SelectorStrategy = SelectorStrategy.css
+    timeout_ms: int = 5000
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.value, str):
+            raise ValueError("selector.value must be a string")
+        value = _strip_non_empty(self.value)
+        timeout_ms = _whole_int(self.timeout_ms)
+        if timeout_ms is None:
+            raise ValueError("selector.timeout_ms must be an integer")
+        if timeout_ms < 0:
+            raise ValueError("selector.timeout_ms must be >= 0")
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "strategy", SelectorStrategy(self.strategy))
+        object.__setattr__(self, "timeout_ms", timeout_ms)
+
+
+def _whole_int(v) -> Optional[int]:
+    # Same inputs pydantic's lax int accepted (ints, whole floats, numeric strings), minus bools
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, int):
         return v
+    if isinstance(v, float):
+        return int(v) if v.is_integer() else None
+    if isinstance(v, str):
+        try:
+            return int(v.strip())
+        except ValueError:
+            return None
+    return None
+
+
+_SELECTOR_KEYS = frozenset(("value", "strategy", "timeout_ms"))
+
+
+def _to_selector(v):
+    # Build the dataclass directly from YAML mappings; pydantic accepts the instance as-is.
+    # Unknown keys are dropped, as the former model's extra="ignore" did
+    if isinstance(v, dict):
+        if not v.keys() <= _SELECTOR_KEYS:
+            v = {k: val for k, val in v.items() if k in _SELECTOR_KEYS}
+        try:
+            return Selector(**v)
+        except TypeError as e:
+            raise ValueError(f"invalid selector: {e}") from e
+    return v
+
+
+SelectorField = Annotated[Selector, BeforeValidator(_to_selector)]
 
 
 # ---------- Step models (discriminated union by 'action') ----------
@@ -90,43 +164,35 @@ class StepBase(BaseModel):
 
 class StepGoto(StepBase):
     action: Literal[ActionName.goto]
-    url: str = Field(..., description="Absolute URL")
-
-    @field_validator("url")
-    @classmethod
-    def _url_non_empty(cls, v: str) -> str:
-        v = v.strip()
-        if not v.startswith("http"):
-            raise ValueError("goto.url must be an absolute http(s) URL")
-        return v
+    url: AbsHttpUrl = Field(..., description="Absolute URL")
 
 
 class StepClick(StepBase):
     action: Literal[ActionName.click]
-    selector: Selector
+    selector: SelectorField
 
 
 class StepHover(StepBase):
     action: Literal[ActionName.hover]
-    selector: Selector
+    selector: SelectorField
 
 
 class StepType(StepBase):
     action: Literal[ActionName.type]
-    selector: Selector
+    selector: SelectorField
     text: str = Field(..., description="Text to type")
     clear: bool = Field(default=True)
 
 
 class StepFill(StepBase):
     action: Literal[ActionName.fill]
-    selector: Selector
+    selector: SelectorField
     text: str = Field(..., description="Text to fill (replaces existing)")
 
 
 class StepPress(StepBase):
     action: Literal[ActionName.press]
-    selector: Optional[Selector] = Field(default=None, description="Optional focused element")
+    selector: Optional[SelectorField] = Field(default=None, description="Optional focused element")
     key: str = Field(..., description="Playwright key string, e.g., 'Enter'")
 
 
@@ -137,7 +203,7 @@ class StepWait(StepBase):
 
 class StepWaitForSelector(StepBase):
     action: Literal[ActionName.wait_for_selector]
-    selector: Selector
+    selector: SelectorField
     state: str = Field(default="visible")
 
 
@@ -148,7 +214,7 @@ class StepWaitForNetworkIdle(StepBase):
 
 class StepSelectOption(StepBase):
     action: Literal[ActionName.select_option]
-    selector: Selector
+    selector: SelectorField
     value: Optional[str] = None
     label: Optional[str] = None
     index: Optional[int] = None
@@ -156,17 +222,17 @@ class StepSelectOption(StepBase):
 
 class StepCheck(StepBase):
     action: Literal[ActionName.check]
-    selector: Selector
+    selector: SelectorField
 
 
 class StepUncheck(StepBase):
     action: Literal[ActionName.uncheck]
-    selector: Selector
+    selector: SelectorField
 
 
 class StepSetInputFiles(StepBase):
     action: Literal[ActionName.set_input_files]
-    selector: Selector
+    selector: SelectorField
     files: list[AbsPath] = Field(..., description="List of local files to upload")
 
 
@@ -174,18 +240,18 @@ class StepScreenshot(StepBase):
     action: Literal[ActionName.screenshot]
     name: str = Field(..., description="Base filename (no extension)")
     full_page: Optional[bool] = Field(default=None)
-    selector: Optional[Selector] = Field(default=None, description="Element to clip (if not full_page)")
+    selector: Optional[SelectorField] = Field(default=None, description="Element to clip (if not full_page)")
 
 
 class StepAssertVisible(StepBase):
     action: Literal[ActionName.assert_visible]
-    selector: Selector
+    selector: SelectorField
     state: Literal["visible", "hidden", "attached", "detached"] = Field(default="visible")
 
 
 class StepAssertText(StepBase):
     action: Literal[ActionName.assert_text]
-    selector: Selector
+    selector: SelectorField
     expect: str = Field(..., description="Expected substring or regex literal /.../")
     regex: bool = Field(default=False, description="Treat expect as regex without surrounding //")
 
@@ -221,8 +287,8 @@ Step = Union[
 
 class Workflow(BaseModel):
     version: str = Field(default="1")
-    site: str = Field(..., description="Site key folder, e.g., 'linear.app'")
-    task: str = Field(..., description="Task name, e.g., 'create_project'")
+    site: NonEmptyStr = Field(..., description="Site key folder, e.g., 'linear.app'")
+    task: NonEmptyStr = Field(..., description="Task name, e.g., 'create_project'")
     description: Optional[str] = None
     tags: list[str] = Field(default_factory=list)
 
@@ -234,32 +300,168 @@ class Workflow(BaseModel):
     default_after_wait_ms: Optional[int] = Field(default=None, ge=0)
     output_dir: Optional[AbsPath] = None
 
-    @field_validator("site")
-    @classmethod
-    def _site_non_empty(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("site cannot be empty")
-        return v
-
-    @field_validator("task")
-    @classmethod
-    def _task_non_empty(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("task cannot be empty")
-        return v
-
     @field_validator("storage_state_file", mode="after")
     @classmethod
     def _default_storage_state(cls, v: Optional[Path], info):
         if v:
             return v
-        settings = get_settings()
         site = info.data.get("site")
         if not site:
             return None
-        return settings.STORAGE_STATE_DIR / f"{site}.json"
+        # get_settings() is memoized, so this is a cache hit after the first workflow
+        return get_settings().STORAGE_STATE_DIR / f"{site}.json"
+
+
+# ---------- Legacy step normalization ----------
+
+
+def _legacy_selector(s: dict) -> dict:
+    return {"value": s.get("selector") or "", "strategy": "css", "timeout_ms": int(s.get("timeout_ms", 15000))}
+
+
+def _with_after_wait(step_obj: dict, wait_after) -> dict:
+    if isinstance(wait_after, int) and wait_after >= 0:
+        step_obj["after_wait_ms"] = wait_after
+    return step_obj
+
+
+def _h_goto(s: dict, sel_obj: Optional[dict]) -> list[dict]:
+    return [_with_after_wait({
+        "action": "goto",
+        "url": s.get("url", ""),
+        "name": s.get("name"),
+    }, s.get("wait"))]
+
+
+def _h_selector_action(action: str):
+    # click / hover: wait for the element, then act on it
+    def _handler(s: dict, sel_obj: Optional[dict]) -> list[dict]:
+        out: list[dict] = []
+        if sel_obj:
+            out.append({"action": "wait_for_selector", "selector": sel_obj, "state": "visible"})
+        out.append(_with_after_wait({
+            "action": action,
+            "selector": sel_obj or _legacy_selector(s),
+            "name": s.get("name"),
+        }, s.get("wait")))
+        return out
+    return _handler
+
+
+def _h_text_input(action: str):
+    # type / fill: same shape, `type` additionally clears first
+    def _handler(s: dict, sel_obj: Optional[dict]) -> list[dict]:
+        out: list[dict] = []
+        if sel_obj:
+            out.append({"action": "wait_for_selector", "selector": sel_obj, "state": "visible"})
+        o = {
+            "action": action,
+            "selector": sel_obj or _legacy_selector(s),
+            "text": s.get("text", ""),
+            "name": s.get("name"),
+        }
+        if action == "type":
+            o["clear"] = True
+        out.append(_with_after_wait(o, s.get("wait")))
+        return out
+    return _handler
+
+
+def _h_press(s: dict, sel_obj: Optional[dict]) -> list[dict]:
+    return [_with_after_wait({
+        "action": "press",
+        "key": s.get("key", "Enter"),
+        "selector": ({"value": s.get("selector", ""), "strategy": "css"} if s.get("selector") else None),
+        "name": s.get("name"),
+    }, s.get("wait"))]
+
+
+def _h_wait(s: dict, sel_obj: Optional[dict]) -> list[dict]:
+    return [{
+        "action": "wait",
+        "ms": int(s.get("ms", s.get("time", s.get("wait", 0))) or 0),
+        "name": s.get("name"),
+    }]
+
+
+_LEGACY_HANDLERS: dict[str, Callable[[dict, Optional[dict]], list[dict]]] = {
+    "navigate": _h_goto,
+    "goto": _h_goto,
+    "click": _h_selector_action("click"),
+    "hover": _h_selector_action("hover"),
+    "type": _h_text_input("type"),
+    "fill": _h_text_input("fill"),
+    "press": _h_press,
+    "wait": _h_wait,
+}
+
+
+def _infer_site_task(p: Path) -> tuple[str, str]:
+    # Try to infer site from parent folder like workflows/<site>/<file>.yaml
+    site = p.parent.name if p.parent else "unknown"
+    task = p.stem
+    return site, task
+
+
+def _is_new_schema(data: dict) -> bool:
+    return "site" in data and "task" in data and isinstance(data.get("steps"), list)
+
+
+def _normalize_legacy(data: dict, p: Path) -> dict:
+    # If clearly already in new schema, return as-is
+    if _is_new_schema(data):
+        return data
+
+    site, task = _infer_site_task(p)
+    steps: list[dict] = []
+    for s in data.get("steps", []) or []:
+        if not isinstance(s, dict):
+            continue
+        action = s.get("action")
+        shot = s.get("screenshot")
+        fn = _LEGACY_HANDLERS.get(action)
+        if fn:
+            sel_obj = _legacy_selector(s) if s.get("selector") else None
+            steps.extend(fn(s, sel_obj))
+        # Ignore unknown actions silently for legacy mode
+
+        # Optional screenshot after this step
+        if shot:
+            steps.append({
+                "action": "screenshot",
+                "name": str(shot),
+            })
+
+    return {
+        "version": data.get("version", "1"),
+        "site": data.get("site", site),
+        "task": data.get("task", task),
+        "description": data.get("description"),
+        "use_storage_state": data.get("use_storage_state", True),
+        "steps": steps,
+    }
+
+
+# ---------- Environment substitution ----------
+
+
+_ENV_RE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+def _env_repl(m: re.Match) -> str:
+    return os.environ.get(m.group(1), m.group(0))
+
+
+def _env_str(loader: yaml.SafeLoader, node: yaml.ScalarNode) -> str:
+    v = loader.construct_scalar(node)
+    return _ENV_RE.sub(_env_repl, v) if "$" in v else v
+
+
+class _EnvLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):  # type: ignore[misc]
+    """Safe YAML loader that expands ${VAR} in string scalars while parsing."""
+
+
+_EnvLoader.add_constructor("tag:yaml.org,2002:str", _env_str)
 
 
 # ---------- Public API ----------
@@ -270,121 +472,15 @@ def load_workflow(path: Path | str) -> Workflow:
     if not wf_path.exists():
         raise FileNotFoundError(f"Workflow file not found: {wf_path}")
 
-    def _infer_site_task(p: Path) -> tuple[str, str]:
-        # Try to infer site from parent folder like workflows/<site>/<file>.yaml
-        site = p.parent.name if p.parent else "unknown"
-        task = p.stem
-        return site, task
-
-    def _normalize_legacy(data: dict, p: Path) -> dict:
-        # If clearly already in new schema, return as-is
-        if "site" in data and "task" in data and isinstance(data.get("steps"), list):
-            return data
-
-        site, task = _infer_site_task(p)
-        steps: list[dict] = []
-        for s in data.get("steps", []) or []:
-            if not isinstance(s, dict):
-                continue
-            action = s.get("action")
-            wait_after = s.get("wait")
-            shot = s.get("screenshot")
-            sel_timeout = int(s.get("timeout_ms", 15000))
-            sel_obj = ({"value": s.get("selector", ""), "strategy": "css", "timeout_ms": sel_timeout}
-                       if s.get("selector") else None)
-
-            def _add_after_wait(step_obj: dict) -> dict:
-                if isinstance(wait_after, int) and wait_after >= 0:
-                    step_obj["after_wait_ms"] = wait_after
-                return step_obj
-
-            if action == "navigate" or action == "goto":
-                steps.append(_add_after_wait({
-                    "action": "goto",
-                    "url": s.get("url", ""),
-                    "name": s.get("name"),
-                }))
-            elif action == "click":
-                if sel_obj:
-                    steps.append({"action": "wait_for_selector", "selector": sel_obj, "state": "visible"})
-                steps.append(_add_after_wait({
-                    "action": "click",
-                    "selector": sel_obj or {"value": "", "strategy": "css", "timeout_ms": sel_timeout},
-                    "name": s.get("name"),
-                }))
-            elif action == "hover":
-                if sel_obj:
-                    steps.append({"action": "wait_for_selector", "selector": sel_obj, "state": "visible"})
-                steps.append(_add_after_wait({
-                    "action": "hover",
-                    "selector": sel_obj or {"value": "", "strategy": "css", "timeout_ms": sel_timeout},
-                    "name": s.get("name"),
-                }))
-            elif action == "type" or action == "fill":
-                key = "type" if action == "type" else "fill"
-                if sel_obj:
-                    steps.append({"action": "wait_for_selector", "selector": sel_obj, "state": "visible"})
-                o = {
-                    "action": key,
-                    "selector": sel_obj or {"value": "", "strategy": "css", "timeout_ms": sel_timeout},
-                    "text": s.get("text", ""),
-                    "name": s.get("name"),
-                }
-                if key == "type":
-                    o["clear"] = True
-                steps.append(_add_after_wait(o))
-            elif action == "press":
-                steps.append(_add_after_wait({
-                    "action": "press",
-                    "key": s.get("key", "Enter"),
-                    "selector": ({"value": s.get("selector", ""), "strategy": "css"} if s.get("selector") else None),
-                    "name": s.get("name"),
-                }))
-            elif action == "wait":
-                steps.append({
-                    "action": "wait",
-                    "ms": int(s.get("ms", s.get("time", s.get("wait", 0))) or 0),
-                    "name": s.get("name"),
-                })
-            # Ignore unknown actions silently for legacy mode
-
-            # Optional screenshot after this step
-            if shot:
-                steps.append({
-                    "action": "screenshot",
-                    "name": str(shot),
-                })
-
-        return {
-            "version": data.get("version", "1"),
-            "site": data.get("site", site),
-            "task": data.get("task", task),
-            "description": data.get("description"),
-            "use_storage_state": data.get("use_storage_state", True),
-            "steps": steps,
-        }
-
     try:
         raw = wf_path.read_text(encoding="utf-8")
-        data = yaml.safe_load(raw)
+        # Environment variables are substituted by the loader itself
+        data = yaml.load(raw, Loader=_EnvLoader)
         if not isinstance(data, dict):
             raise ValueError("Workflow YAML must define a mapping/object at the top level.")
-        data = _normalize_legacy(data, wf_path)
-
-        # Environment variable substitution for all string fields
-        def _subst_env(obj):
-            if isinstance(obj, str):
-                def repl(m):
-                    key = m.group(1)
-                    return os.environ.get(key, m.group(0))
-                return re.sub(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}", repl, obj)
-            if isinstance(obj, list):
-                return [_subst_env(x) for x in obj]
-            if isinstance(obj, dict):
-                return {k: _subst_env(v) for k, v in obj.items()}
-            return obj
-
-        data = _subst_env(data)
+        if not _is_new_schema(data):
+            data = _normalize_legacy(data, wf_path)
+
         wf = Workflow.model_validate(data)
         return wf
     except ValidationError as ve:
@@ -405,31 +501,15 @@ def load_workflows_file(path: Path | str) -> list[Workflow]:
         raise FileNotFoundError(f"Workflow file not found: {wf_path}")
     try:
         raw = wf_path.read_text(encoding="utf-8")
-        docs = list(yaml.safe_load_all(raw))
         out: list[Workflow] = []
-        for idx, data in enumerate(docs, start=1):
+        # Stream documents so only one raw mapping is alive at a time;
+        # environment variables are substituted by the loader itself
+        for idx, data in enumerate(yaml.load_all(raw, Loader=_EnvLoader), start=1):
             if data is None:
                 continue
             if not isinstance(data, dict):
                 raise ValueError(f"Document {idx} in {wf_path} must be a mapping/object.")
-            try:
-                norm = locals().get("_normalize_legacy")(data, wf_path)  # use inner helper
-            except Exception:
-                # Fallback if helper is not present for some reason
-                norm = data
-            # Environment variable substitution
-            def _subst_env(obj):
-                if isinstance(obj, str):
-                    def repl(m):
-                        key = m.group(1)
-                        return os.environ.get(key, m.group(0))
-                    return re.sub(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}", repl, obj)
-                if isinstance(obj, list):
-                    return [_subst_env(x) for x in obj]
-                if isinstance(obj, dict):
-                    return {k: _subst_env(v) for k, v in obj.items()}
-                return obj
-            norm = _subst_env(norm)
+            norm = data if _is_new_schema(data) else _normalize_legacy(data, wf_path)
             try:
                 out.append(Workflow.model_validate(norm))
             except ValidationError as ve:
@@ -453,6 +533,7 @@ __all__ = [
     "Workflow",
     "load_workflow",
     "load_workflows_file",
+    "reset_cwd",
 ]
 
 
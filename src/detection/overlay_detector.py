@@ -12,6 +12,7 @@ from typing import List, Optional, Tuple
 
 from playwright.sync_api import Page, Locator
 
+from src.detection.page_scripts import ScanRow, run_scan
 from src.utils.logger import get_logger
 
 
@@ -41,6 +42,9 @@ class OverlayDetector:
         '[aria-hidden="true"][style*="position: fixed"],[aria-hidden="true"][style*="position: absolute"]'
     )
 
+    # Candidates examined per scan (document order)
+    MAX_CANDIDATES = 50
+
     def __init__(self) -> None:
         self.log = get_logger(__name__)
 
@@ -50,83 +54,35 @@ class OverlayDetector:
         """
         Return the most prominent overlay/backdrop if present; else None.
         """
-        overlays = self.find_all(page)
-        return overlays[0] if overlays else None
+        scanned = self._scan(page)
+        # Rank the raw scan rows; only the winner becomes an OverlayInfo
+        return self._to_info(page.locator(self.CANDIDATE_CSS), max(scanned, key=_rank)) if scanned else None
 
     def find_all(self, page: Page) -> List[OverlayInfo]:
         """
         Return overlays sorted by descending z-index.
         """
-        res: List[OverlayInfo] = []
+        scanned = self._scan(page)
+        scanned.sort(key=_rank, reverse=True)
         locs = page.locator(self.CANDIDATE_CSS)
-        count = locs.count()
-
-        for i in range(count):
-            loc = locs.nth(i)
-            try:
-                if not loc.is_visible():
-                    continue
-                info = self._score_overlay(page, loc)
-                if info:
-                    res.append(info)
-            except Exception:
-                continue
-
-        res.sort(key=lambda x: (x.z_index, x.bbox[2] * x.bbox[3], x.opacity), reverse=True)
-        return res
+        return [self._to_info(locs, row) for row in scanned]
 
     # -------------- Internals --------------
 
-    def _score_overlay(self, page: Page, loc: Locator) -> Optional[OverlayInfo]:
-        """
-        Return OverlayInfo if element looks like a true overlay/backdrop; otherwise None.
-        """
+    def _scan(self, page: Page) -> List[ScanRow]:
         try:
-            data = loc.evaluate(
-                """(el) => {
-                    const cs = getComputedStyle(el);
-                    const pos = cs.position;
-                    if (!['fixed','absolute'].includes(pos)) return null;
-
-                    const r = el.getBoundingClientRect();
-                    const vw = window.innerWidth, vh = window.innerHeight;
-
-                    // must cover most of the viewport
-                    const covers = r.width >= vw * 0.9 && r.height >= vh * 0.9;
-
-                    // opacity/background check (allow semi-transparent)
-                    const alpha = parseFloat(cs.opacity);
-                    const bg = cs.backgroundColor || '';
-                    const visibleBg = alpha >= 0.05 || (bg && bg !== 'rgba(0, 0, 0, 0)');
-
-                    // compute z-index (NaN => 0)
-                    const ziRaw = parseInt(cs.zIndex, 10);
-                    const zi = Number.isFinite(ziRaw) ? ziRaw : 0;
-
-                    if (!covers || !visibleBg) return null;
-
-                    const hint = (el.tagName.toLowerCase()
-                                  + (el.id ? '#' + el.id : '')
-                                  + (el.className && typeof el.className === 'string'
-                                      ? '.' + el.className.trim().split(/\\s+/).slice(0,2).join('.')
-                                      : '')).slice(0, 120);
-                    return {
-                      hint,
-                      z: zi,
-                      bbox: {x:r.left, y:r.top, w:r.width, h:r.height},
-                      opacity: alpha || 0
-                    };
-                }"""
-            )
-            if not data:
-                return None
-
-            return OverlayInfo(
-                locator=loc,
-                selector_hint=data["hint"],
-                z_index=int(data["z"]),
-                bbox=(int(data["bbox"]["x"]), int(data["bbox"]["y"]), int(data["bbox"]["w"]), int(data["bbox"]["h"])),
-                opacity=float(data["opacity"]),
-            )
-        except Exception:
-            return None
+            return run_scan(page, "scanOverlays", {"sel": self.CANDIDATE_CSS, "max": self.MAX_CANDIDATES})
+        except Exception as e:
+            self.log.debug(f"Overlay scan failed: {e!r}")
+            return []
+
+    @staticmethod
+    def _to_info(locs: Locator, row: ScanRow) -> OverlayInfo:
+        i, hint, z, bbox, opacity = row
+        return OverlayInfo(locator=locs.nth(i), selector_hint=hint, z_index=z, bbox=bbox, opacity=opacity)
+
+
+def _rank(row: ScanRow) -> Tuple[int, int, float]:
+    # (z-index, area, opacity)
+    bbox = row[3]
+    return row[2], bbox[2] * bbox[3], row[4]
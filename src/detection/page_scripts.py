@@ -0,0 +1,442 @@
+# src/detection/page_scripts.py
+from __future__ import annotations
+
+"""In-page detection helpers
+---------------------------
+JS helpers shared by the detectors (and the selector fallback strategy),
+installed once per Page under `window.__uiCap` (init script for new documents
++ one evaluate for the current one). Callers then invoke them by name instead
+of re-sending the source.
+"""
+
+import weakref
+from typing import Any, List, Tuple
+
+from playwright.sync_api import Page
+
+
+# readStyle(el) -> {pos, z, op, bg, vis}; readRect(el, given?) -> DOMRect
+# Per-element snapshots kept in ns.styleCache (a WeakMap) for one detection pass: scanModals
+# starts a fresh pass, and a scanOverlays issued within STYLE_PASS_MS of it reuses the pass
+# (otherwise it starts its own). State that changes without any DOM event (:hover/:focus-within
+# styling, el.animate(), late image/font layout) therefore can't go stale across steps. Within
+# a pass, DOM mutations, scroll/resize and transition/animation ends still drop the cache.
+# Caching starts once <html> exists (init scripts run before it), so early reads aren't cached.
+_STYLE_CACHE_JS = """
+  (() => {
+    const STYLE_PASS_MS = 250;
+    let watching = false, passAt = -Infinity;
+    const reset = () => { ns.styleCache = new WeakMap(); };
+    ns.beginStylePass = (reuse) => {
+      const now = performance.now();
+      if (reuse && now - passAt <= STYLE_PASS_MS) return;
+      reset();
+      ns.shadowSeen = undefined;
+      passAt = now;
+    };
+    // Open shadow roots anywhere in the document (one walk per pass): Playwright's CSS pierces
+    // them and querySelectorAll doesn't, so match indexes would stop lining up with nth(i)
+    ns.hasOpenShadow = () => {
+      if (ns.shadowSeen === undefined) {
+        ns.shadowSeen = false;
+        for (const n of document.querySelectorAll('*')) { if (n.shadowRoot) { ns.shadowSeen = true; break; } }
+      }
+      return ns.shadowSeen;
+    };
+    const watch = () => {
+      if (watching || !document.documentElement) return watching;
+      watching = true;
+      reset();
+      new MutationObserver(reset).observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+      for (const ev of ['scroll', 'resize', 'transitionend', 'animationend']) {
+        window.addEventListener(ev, reset, {capture: true, passive: true});
+      }
+      return true;
+    };
+    const entry = (el) => {
+      let v = watching || watch() ? ns.styleCache.get(el) : undefined;
+      if (!v) {
+        const cs = getComputedStyle(el);
+        const zi = parseInt(cs.zIndex, 10);
+        v = {
+          pos: cs.position,
+          z: Number.isFinite(zi) ? zi : 0,
+          op: parseFloat(cs.opacity),
+          bg: cs.backgroundColor || '',
+          // checkVisibility() walks ancestors natively; fall back to the element's own style on older engines
+          vis: el.checkVisibility
+            ? el.checkVisibility({checkOpacity: true, checkVisibilityCSS: true})
+            : !(cs.visibility === 'hidden' || cs.display === 'none' || parseFloat(cs.opacity) === 0),
+          r: null,
+        };
+        if (watching) ns.styleCache.set(el, v);
+      }
+      return v;
+    };
+    ns.readStyle = entry;
+    ns.readRect = (el, given) => {
+      const v = entry(el);
+      return v.r || (v.r = given || el.getBoundingClientRect());
+    };
+  })()
+"""
+
+# Scans return {hints: [str], nums: [i, z, x, y, w, h, extra, ...]}: one hint and SCAN_STRIDE
+# numbers per candidate, which is far less to serialize than an object per row (see unpack_scan).
+# Both take an optional `els`, the matches as Playwright enumerates them. Without it they use
+# querySelectorAll, unless the page has open shadow roots: then they return {pierce: true}
+# and run_scan re-runs them over Playwright's matches, so `i` always agrees with nth(i).
+
+# scanModals({sel, bsel, max, exitZ}, els?) -> rows with extra = hasBackdrop (0/1)
+# `i` indexes the matches of `sel`, so callers can rebuild a Locator with nth(i). The scan
+# stops once `max` candidates have passed the visibility/viewport filters (hidden matches don't
+# count, so portal-mounted dialogs at the end of <body> are still reached); with `exitZ` set, it
+# also stops at the first backdropped candidate whose z-index reaches it.
+_SCAN_MODALS_JS = """
+  (args, els) => {
+    ns.beginStylePass(false);
+    if (!els && ns.hasOpenShadow()) return {pierce: true};
+    const vw = window.innerWidth, vh = window.innerHeight;
+    const hintFor = (el) => {
+      const id = el.id ? '#' + el.id : '';
+      const cls = el.className && typeof el.className === 'string' ? '.' + el.className.trim().split(/\\s+/).slice(0,2).join('.') : '';
+      return (el.tagName.toLowerCase() + id + cls).slice(0,120);
+    };
+    // Siblings are shared between candidates (and with a following scanOverlays); only the
+    // positioned, non-transparent ones are measured
+    const isBackdrop = (n) => {
+      const s = ns.readStyle(n);
+      if (s.pos !== 'fixed' && s.pos !== 'absolute') return false;
+      if (!(s.op >= 0.1 || (s.bg && s.bg !== 'rgba(0, 0, 0, 0)'))) return false;
+      const r = ns.readRect(n);
+      return r.width >= vw*0.95 && r.height >= vh*0.95;
+    };
+    const siblingBackdrop = (el) => {
+      // One pass over the siblings, previous sibling first (the common overlay-before-modal layout)
+      const prev = el.previousElementSibling;
+      if (prev && isBackdrop(prev)) return true;
+      const p = el.parentElement;
+      if (!p) return false;
+      for (const c of p.children) {
+        if (c !== el && c !== prev && isBackdrop(c)) return true;
+      }
+      return false;
+    };
+
+    // Modal semantics that already imply a backdrop: skip the sibling walk for these.
+    // Only showModal() dialogs count; show() / static <dialog open> have no backdrop. Engines
+    // without :modal fall back to the sibling walk for dialogs.
+    const isModalDialog = (el) => {
+      if (el.tagName !== 'DIALOG') return false;
+      try { return el.matches(':modal'); } catch (e) { return false; }
+    };
+    const impliedBackdrop = (el) => isModalDialog(el)
+      || (el.getAttribute('role') === 'alertdialog' && el.getAttribute('aria-modal') === 'true');
+
+    // Explicit backdrop matches apply to every candidate, so resolve them once
+    const pageBackdrop = Array.from(document.querySelectorAll(args.bsel)).slice(0, 5).some((b) => {
+      const r = ns.readRect(b);
+      return r.width > 0 && r.height > 0 && ns.readStyle(b).vis;
+    });
+
+    const hints = [], nums = [];
+    // qSA already yields each node once however many selector parts match it
+    const nodes = els || document.querySelectorAll(args.sel);
+    const max = args.max || nodes.length;
+    for (let i = 0; i < nodes.length; i++) {
+      const el = nodes[i];
+      if (SKIP_TAGS.has(el.tagName)) continue;
+      // At most one style read and one layout read per candidate
+      const st = ns.readStyle(el);
+      const r = ns.readRect(el);
+      if (r.width === 0 || r.height === 0 || !st.vis) continue;
+      const cx = r.left + r.width/2, cy = r.top + r.height/2;
+      if (!(cx >= 0 && cy >= 0 && cx <= vw && cy <= vh)) continue;
+      const backdrop = pageBackdrop || impliedBackdrop(el) || siblingBackdrop(el);
+      hints.push(hintFor(el));
+      nums.push(i, st.z, r.left, r.top, r.width, r.height, backdrop ? 1 : 0);
+      if (hints.length >= max || (args.exitZ != null && backdrop && st.z >= args.exitZ)) break;
+    }
+    return {hints, nums};
+  }
+"""
+
+# scanOverlays({sel, max}, els?) -> Promise<rows with extra = opacity>
+# An IntersectionObserver pre-filters to viewport-intersecting matches and hands over their
+# rects; if it doesn't report within 50 ms (throttled/background page) every match is scored.
+# Scoring stops after `max` overlays (document order); matches that fail the filters don't count.
+_SCAN_OVERLAYS_JS = """
+  (args, els) => new Promise((resolve) => {
+    ns.beginStylePass(true);
+    if (!els && ns.hasOpenShadow()) return resolve({pierce: true});
+    const vw = window.innerWidth, vh = window.innerHeight;
+    const scoreOverlay = (el, rect) => {
+      // At most one style read and one layout read per candidate (none when cached)
+      const st = ns.readStyle(el);
+      const r = ns.readRect(el, rect);
+      if (r.width === 0 || r.height === 0 || !st.vis) return null;
+      if (st.pos !== 'fixed' && st.pos !== 'absolute') return null;
+
+      // must cover most of the viewport
+      const covers = r.width >= vw * 0.9 && r.height >= vh * 0.9;
+
+      // opacity/background check (allow semi-transparent)
+      const alpha = st.op;
+      const visibleBg = alpha >= 0.05 || (st.bg && st.bg !== 'rgba(0, 0, 0, 0)');
+
+      if (!covers || !visibleBg) return null;
+
+      const hint = (el.tagName.toLowerCase()
+                    + (el.id ? '#' + el.id : '')
+                    + (el.className && typeof el.className === 'string'
+                        ? '.' + el.className.trim().split(/\\s+/).slice(0,2).join('.')
+                        : '')).slice(0, 120);
+      return [hint, [st.z, r.left, r.top, r.width, r.height, alpha || 0]];
+    };
+
+    // qSA already yields each node once; drop non-rendering tags before any style read,
+    // keeping each node's index in the full match list for nth(i)
+    const all = els || document.querySelectorAll(args.sel);
+    const index = new Map();
+    for (let i = 0; i < all.length; i++) {
+      if (!SKIP_TAGS.has(all[i].tagName)) index.set(all[i], i);
+    }
+    const nodes = Array.from(index.keys());
+    const max = args.max || all.length;
+    const score = (pairs) => {
+      const hints = [], nums = [];
+      for (const [i, rect] of pairs) {
+        const info = scoreOverlay(all[i], rect);
+        if (!info) continue;
+        hints.push(info[0]);
+        nums.push(i, ...info[1]);
+        if (hints.length >= max) break;
+      }
+      return {hints, nums};
+    };
+    const everyNode = () => Array.from(index.values(), (i) => [i, null]);
+    if (!nodes.length || typeof IntersectionObserver !== 'function') {
+      resolve(score(everyNode()));
+      return;
+    }
+
+    const hits = [];
+    let reported = 0, done = false;
+    const finish = (pairs) => {
+      if (done) return;
+      done = true;
+      io.disconnect();
+      clearTimeout(timer);
+      resolve(score(pairs));
+    };
+    const io = new IntersectionObserver((entries) => {
+      for (const e of entries) {
+        reported++;
+        if (e.isIntersecting) hits.push([index.get(e.target), e.boundingClientRect]);
+      }
+      // The initial notification covers every observed node, possibly over several callbacks
+      if (reported >= nodes.length) finish(hits.sort((a, b) => a[0] - b[0]));
+    });
+    const timer = setTimeout(() => finish(everyNode()), 50);
+    nodes.forEach((n) => io.observe(n));
+  })
+"""
+
+# domIdle() -> ms since the latest DOM mutation (observer attached lazily on first call,
+# since init scripts run before <html> exists). Idle time is computed in-page so
+# callers never compare the page clock against their own.
+_DOM_IDLE_JS = """
+  () => {
+    const ns = window.__uiCap;
+    if (!ns.domCounter) {
+      ns.domCounter = { n: 0, last: Date.now() };
+      const obs = new MutationObserver(() => {
+        ns.domCounter.n++;
+        ns.domCounter.last = Date.now();
+      });
+      obs.observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    return Date.now() - ns.domCounter.last;
+  }
+"""
+
+# waitDomStable({settle, max}) -> Promise<bool>: resolves true once no mutation has been
+# seen for `settle` ms (after two paint cycles), or false when `max` ms elapse first.
+_WAIT_DOM_STABLE_JS = """
+  (args) => new Promise((resolve) => {
+    const settle = args.settle, max = args.max;
+    let last = Date.now();
+    const start = last;
+    const obs = new MutationObserver(() => { last = Date.now(); });
+    obs.observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+    const check = () => {
+      const now = Date.now(), idle = now - last;
+      if (idle >= settle) {
+        obs.disconnect();
+        requestAnimationFrame(() => requestAnimationFrame(() => resolve(true)));
+      } else if (now - start >= max) {
+        obs.disconnect();
+        resolve(false);
+      } else {
+        setTimeout(check, Math.min(50, settle - idle));
+      }
+    };
+    check();
+  })
+"""
+
+# animationsDone({sel, cap, minIdle}) -> Promise<number>: waits for running Web Animations
+# (CSS transitions/animations included) under `sel` (or the whole document) to finish,
+# capped at `cap` ms, plus `minIdle` ms of grace if any were running. Infinite animations
+# never finish and are ignored. Resolves with the number of animations awaited.
+_ANIMATIONS_DONE_JS = """
+  (args) => {
+    const anims = args.sel
+      ? Array.from(document.querySelectorAll(args.sel)).flatMap(el => el.getAnimations({subtree: true}))
+      : document.getAnimations();
+    const running = anims.filter(a => {
+      if (a.playState !== 'running') return false;
+      const t = a.effect && a.effect.getComputedTiming();
+      return !t || t.endTime !== Infinity;
+    });
+    const done = Promise.all(running.map(a => a.finished.catch(() => {})));
+    const grace = running.length ? (args.minIdle || 0) : 0;
+    return Promise.race([done, new Promise(r => setTimeout(r, args.cap))])
+      .then(() => new Promise(r => setTimeout(r, grace)))
+      .then(() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(() => r(running.length)))));
+  }
+"""
+
+# settle({settle, max, sel, cap, minIdle, animations}) -> Promise<bool>: DOM quiet + animations
+# finished, awaited concurrently; resolves with the DOM-stable result.
+_SETTLE_JS = """
+  (args) => Promise.all([
+    window.__uiCap.waitDomStable(args),
+    args.animations ? window.__uiCap.animationsDone(args) : true,
+  ]).then(([domStable]) => domStable)
+"""
+
+# probeSelectors([[kind, value] | null, ...]) -> [2 visible | 1 present | 0 absent | null unknown]
+# kind is "css" or "xpath"; only the first match is inspected, like Locator.first. Entries the
+# browser can't evaluate natively (null, Playwright-only CSS extensions) come back null, as does
+# all CSS on pages with open shadow roots (Playwright's CSS pierces them, querySelector doesn't).
+_PROBE_SELECTORS_JS = """
+  (items) => {
+    let shadow;
+    const hasShadow = () => {
+      if (shadow === undefined) {
+        shadow = false;
+        for (const n of document.querySelectorAll('*')) { if (n.shadowRoot) { shadow = true; break; } }
+      }
+      return shadow;
+    };
+    return items.map((it) => {
+      if (!it || (it[0] === 'css' && hasShadow())) return null;
+      let el;
+      try {
+        el = it[0] === 'xpath'
+          ? document.evaluate(it[1], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+          : document.querySelector(it[1]);
+      } catch (e) {
+        return null;
+      }
+      if (!el) return 0;
+      if (!(el instanceof Element)) return 1;
+      // Same notion as Playwright's is_visible(): non-empty box, not visibility:hidden
+      const r = el.getBoundingClientRect();
+      if (r.width <= 0 || r.height <= 0) return 1;
+      const shown = el.checkVisibility
+        ? el.checkVisibility({checkVisibilityCSS: true})
+        : getComputedStyle(el).visibility !== 'hidden';
+      return shown ? 2 : 1;
+    });
+  }
+"""
+
+BUNDLE_JS = (
+    "(() => {\n"
+    "  const ns = window.__uiCap = window.__uiCap || {};\n"
+    "  if (ns.scanModals) return;\n"
+    "  // Matches of the candidate selectors that can never render as a dialog/overlay\n"
+    "  const SKIP_TAGS = new Set(['SCRIPT', 'STYLE', 'LINK', 'META', 'HEAD', 'TEMPLATE', 'NOSCRIPT']);\n"
+    "  " + _STYLE_CACHE_JS.strip() + ";\n"
+    "  ns.scanModals = " + _SCAN_MODALS_JS.strip() + ";\n"
+    "  ns.scanOverlays = " + _SCAN_OVERLAYS_JS.strip() + ";\n"
+    "  ns.domIdle = " + _DOM_IDLE_JS.strip() + ";\n"
+    "  ns.waitDomStable = " + _WAIT_DOM_STABLE_JS.strip() + ";\n"
+    "  ns.animationsDone = " + _ANIMATIONS_DONE_JS.strip() + ";\n"
+    "  ns.settle = " + _SETTLE_JS.strip() + ";\n"
+    "  ns.probeSelectors = " + _PROBE_SELECTORS_JS.strip() + ";\n"
+    "})()"
+)
+
+# Awaits the helper so promise-returning helpers resolve in the same round-trip
+_CALL_JS = """
+async ([name, arg]) => {
+  const ns = window.__uiCap;
+  if (!ns || typeof ns[name] !== 'function') return {missing: true};
+  return {value: await ns[name](arg)};
+}
+"""
+
+# Same scan over the matches Playwright itself enumerates for `sel` (see run_scan)
+_SCAN_ELEMENTS_JS = """
+(els, [name, arg]) => window.__uiCap[name](arg, els)
+"""
+
+_installed: "weakref.WeakSet[Page]" = weakref.WeakSet()
+
+# Numbers per candidate in a scan's flat `nums`: i, z, x, y, w, h, extra
+SCAN_STRIDE = 7
+
+# (i, hint, z, (x, y, w, h), extra)
+ScanRow = Tuple[int, str, int, Tuple[int, int, int, int], float]
+
+
+def ensure_installed(page: Page) -> None:
+    """Install the helpers for this page (idempotent; later documents get them via init script)."""
+    if page in _installed:
+        return
+    page.add_init_script(BUNDLE_JS)
+    page.evaluate(BUNDLE_JS)
+    _installed.add(page)
+
+
+def call_helper(page: Page, name: str, arg: Any = None) -> Any:
+    """Run `window.__uiCap[name](arg)` in one round-trip and return its (awaited) value."""
+    ensure_installed(page)
+    res = page.evaluate(_CALL_JS, [name, arg])
+    if res.get("missing"):
+        # Document predates the init script (e.g. about:blank swap); install and retry once
+        page.evaluate(BUNDLE_JS)
+        res = page.evaluate(_CALL_JS, [name, arg])
+    return res.get("value")
+
+
+def run_scan(page: Page, name: str, args: dict) -> List[ScanRow]:
+    """
+    Run a scan helper and decode its rows. On pages with open shadow roots the scan defers to
+    Playwright's own enumeration of `args["sel"]` (one more round-trip), since that is the
+    order Locator.nth(i) indexes into.
+    """
+    res = call_helper(page, name, args)
+    if res and res.get("pierce"):
+        res = page.locator(args["sel"]).evaluate_all(_SCAN_ELEMENTS_JS, [name, args])
+    return unpack_scan(res)
+
+
+def unpack_scan(res: Any) -> List[ScanRow]:
+    """Decode a scan's flat {hints, nums} payload into (i, hint, z, bbox, extra) rows."""
+    if not res:
+        return []
+    hints, nums = res["hints"], res["nums"]
+    return [
+        (
+            int(nums[k]),
+            hints[n],
+            int(nums[k + 1]),
+            (int(nums[k + 2]), int(nums[k + 3]), int(nums[k + 4]), int(nums[k + 5])),
+            float(nums[k + 6]),
+        )
+        for n, k in enumerate(range(0, len(nums), SCAN_STRIDE))
+    ]
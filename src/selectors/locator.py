@@ -1,7 +1,8 @@
 # src/selectors/locator.py
 from __future__ import annotations
 
-from typing import Optional, Tuple
+import functools
+from typing import Dict, Optional, Tuple
 
 from playwright.sync_api import Locator, Page
 
@@ -10,7 +11,15 @@ from src.utils.logger import get_logger
 
 log = get_logger(__name__)
 
+# Locators are lazy, immutable queries, so one per (page, strategy, value) can be reused
+# across retries and steps. The cache lives on the Page itself: every Locator references its
+# page, so a module-level map keyed by Page (even a weak one) would keep pages alive forever.
+# It is dropped when the page closes and otherwise collected together with the page.
+_CACHE_ATTR = "_ui_capture_locators"
+LocatorCache = Dict[Tuple[SelectorStrategy, str], Locator]
 
+
+@functools.lru_cache(maxsize=256)
 def _parse_role_value(value: str) -> Tuple[str, Optional[str]]:
     """
     Accept a few simple role notations for flexibility:
@@ -34,8 +43,38 @@ def _parse_role_value(value: str) -> Tuple[str, Optional[str]]:
 
 def resolve_locator(page: Page, sel: Selector) -> Locator:
     """
-    Convert our schema Selector into a Playwright Locator.
+    Convert our schema Selector into a Playwright Locator (memoized per page).
     """
+    cache = _page_cache(page)
+    if cache is None:
+        return _build_locator(page, sel)
+    key = (sel.strategy, sel.value)
+    loc = cache.get(key)
+    if loc is None:
+        loc = cache[key] = _build_locator(page, sel)
+    return loc
+
+
+def _page_cache(page: Page) -> Optional[LocatorCache]:
+    cache = getattr(page, _CACHE_ATTR, None)
+    if cache is not None:
+        return cache
+    if page.is_closed():
+        return None
+    cache = {}
+    try:
+        setattr(page, _CACHE_ATTR, cache)
+    except AttributeError:
+        return None
+    page.once("close", _drop_page_cache)
+    return cache
+
+
+def _drop_page_cache(page: Page) -> None:
+    page.__dict__.pop(_CACHE_ATTR, None)
+
+
+def _build_locator(page: Page, sel: Selector) -> Locator:
     strategy = sel.strategy
     value = sel.value
 
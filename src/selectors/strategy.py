@@ -2,17 +2,25 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
 
 from playwright.sync_api import Locator, Page
 
-from src.core.workflow_loader import Selector
+from src.core.workflow_loader import Selector, SelectorStrategy
+from src.detection.page_scripts import call_helper
 from src.selectors.locator import resolve_locator
 from src.utils.logger import get_logger
 from src.utils.timing import retry, sleep_ms
 
 log = get_logger(__name__)
 
+# Backoff between attempts of an action on an already-chosen locator
+ACTION_RETRY_INITIAL_MS = 50
+ACTION_RETRY_MAX_MS = 400
+
+# probeSelectors states
+_ABSENT, _PRESENT, _VISIBLE = 0, 1, 2
+
 
 class SelectorNotFound(RuntimeError):
     pass
@@ -22,6 +30,15 @@ class ActionRetryError(RuntimeError):
     pass
 
 
+def _probe_item(sel: Selector) -> Optional[List[str]]:
+    # Only strategies whose matching the browser can reproduce exactly; role/text go through Playwright
+    if sel.strategy == SelectorStrategy.css:
+        return ["css", sel.value]
+    if sel.strategy == SelectorStrategy.xpath:
+        return ["xpath", sel.value]
+    return None
+
+
 @dataclass
 class ChosenLocator:
     selector: Selector
@@ -48,17 +65,25 @@ class LocatorStrategy:
     def choose(self, selectors: Sequence[Selector], *, require_visible: bool = True) -> ChosenLocator:
         errors: List[str] = []
         first_present: Optional[Tuple[int, Selector, Locator]] = None
+        states = self._probe(selectors)
 
         for idx, sel in enumerate(selectors):
-            loc = resolve_locator(self.page, sel)
+            state = states[idx]
             try:
-                # Fast existence check
-                if loc.count() == 0:
+                if state == _ABSENT:
                     errors.append(f"[{idx}] none found: {sel.strategy}:{sel.value}")
                     continue
 
+                loc = resolve_locator(self.page, sel)
+                if state is None:
+                    # Not probed in-page (text/role, Playwright-only CSS): ask Playwright directly
+                    if loc.count() == 0:
+                        errors.append(f"[{idx}] none found: {sel.strategy}:{sel.value}")
+                        continue
+                    state = _VISIBLE if require_visible and loc.first.is_visible() else _PRESENT
+
                 # Visible wins immediately
-                if require_visible and loc.first.is_visible(timeout=self.per_selector_wait_ms):
+                if require_visible and state == _VISIBLE:
                     return ChosenLocator(selector=sel, locator=loc.first, how="visible", index=idx)
 
                 # otherwise remember that at least something matched
@@ -80,57 +105,62 @@ class LocatorStrategy:
             "No selector matched (or became visible). Tried:\n  " + "\n  ".join(errors or ["<none>"])
         )
 
+    def _probe(self, selectors: Sequence[Selector]) -> List[Optional[int]]:
+        """
+        Existence/visibility of every css/xpath selector's first match in one evaluate.
+        Entries that can't be answered in-page (or a failed probe) come back None.
+        """
+        items = [_probe_item(sel) for sel in selectors]
+        if any(items):
+            try:
+                states = call_helper(self.page, "probeSelectors", items)
+                if isinstance(states, list) and len(states) == len(items):
+                    return states
+            except Exception as e:
+                log.debug(f"Selector probe failed, checking one by one: {e!r}")
+        return [None] * len(items)
+
     # ---------- Convenience Actions (with fallback) ----------
+    # Selection happens once; only the action itself is retried (the Locator re-resolves on
+    # each attempt), so a failing action no longer re-waits on every fallback selector.
 
-    def click(self, selectors: Sequence[Selector], *, retries: int = 2) -> ChosenLocator:
-        def _do() -> ChosenLocator:
+    def _act(self, selectors: Sequence[Selector], action: Callable[[Locator], object], what: str, retries: int) -> ChosenLocator:
+        try:
             chosen = self.choose(selectors, require_visible=True)
-            chosen.locator.click()
+            retry(
+                action,
+                chosen.locator,
+                tries=max(1, retries + 1),
+                initial_delay_ms=ACTION_RETRY_INITIAL_MS,
+                max_delay_ms=ACTION_RETRY_MAX_MS,
+            )
             return chosen
-
-        try:
-            return retry(_do, tries=max(1, retries + 1))
         except Exception as e:
-            raise ActionRetryError(f"click failed after retries: {e}") from e
+            raise ActionRetryError(f"{what} failed after retries: {e}") from e
+
+    def click(self, selectors: Sequence[Selector], *, retries: int = 2) -> ChosenLocator:
+        return self._act(selectors, lambda loc: loc.click(), "click", retries)
 
     def fill(self, selectors: Sequence[Selector], text: str, *, clear: bool = True, retries: int = 1) -> ChosenLocator:
-        def _do() -> ChosenLocator:
-            chosen = self.choose(selectors, require_visible=True)
+        def _do(loc: Locator) -> None:
             if clear:
-                chosen.locator.fill(text)
+                loc.fill(text)
             else:
-                chosen.locator.type(text)
-            return chosen
+                loc.type(text)
 
-        try:
-            return retry(_do, tries=max(1, retries + 1))
-        except Exception as e:
-            raise ActionRetryError(f"fill/type failed after retries: {e}") from e
+        return self._act(selectors, _do, "fill/type", retries)
 
     def hover(self, selectors: Sequence[Selector], *, retries: int = 1) -> ChosenLocator:
-        def _do() -> ChosenLocator:
-            chosen = self.choose(selectors, require_visible=True)
-            chosen.locator.hover()
-            return chosen
-
-        try:
-            return retry(_do, tries=max(1, retries + 1))
-        except Exception as e:
-            raise ActionRetryError(f"hover failed after retries: {e}") from e
+        return self._act(selectors, lambda loc: loc.hover(), "hover", retries)
 
     def check(self, selectors: Sequence[Selector], *, should_check: bool = True, retries: int = 1) -> ChosenLocator:
-        def _do() -> ChosenLocator:
-            chosen = self.choose(selectors, require_visible=True)
+        def _do(loc: Locator) -> None:
             if should_check:
-                chosen.locator.check()
+                loc.check()
             else:
-                chosen.locator.uncheck()
-            return chosen
+                loc.uncheck()
 
-        try:
-            return retry(_do, tries=max(1, retries + 1))
-        except Exception as e:
-            raise ActionRetryError(f"check/uncheck failed after retries: {e}") from e
+        return self._act(selectors, _do, "check/uncheck", retries)
 
     def select_option(
         self,
@@ -141,14 +171,5 @@ class LocatorStrategy:
         index: Optional[int] = None,
         retries: int = 1,
     ) -> ChosenLocator:
-        opts = {"value": value, "label": label, "index": index}
-
-        def _do() -> ChosenLocator:
-            chosen = self.choose(selectors, require_visible=True)
-            chosen.locator.select_option({k: v for k, v in opts.items() if v is not None})
-            return chosen
-
-        try:
-            return retry(_do, tries=max(1, retries + 1))
-        except Exception as e:
-            raise ActionRetryError(f"select_option failed after retries: {e}") from e
+        opts = {k: v for k, v in {"value": value, "label": label, "index": index}.items() if v is not None}
+        return self._act(selectors, lambda loc: loc.select_option(opts), "select_option", retries)
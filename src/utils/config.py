@@ -1,12 +1,14 @@
 # src/utils/config.py
 from __future__ import annotations
 
-import functools
+import logging
+import os
+import threading
 from enum import Enum
 from pathlib import Path
 from typing import Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -30,6 +32,20 @@ class LogLevel(str, Enum):
     ERROR = "ERROR"
     CRITICAL = "CRITICAL"
 
+    @property
+    def py_level(self) -> int:
+        """The stdlib `logging` level number."""
+        return _PY_LEVELS[self]
+
+
+_PY_LEVELS = {
+    LogLevel.DEBUG: logging.DEBUG,
+    LogLevel.INFO: logging.INFO,
+    LogLevel.WARNING: logging.WARNING,
+    LogLevel.ERROR: logging.ERROR,
+    LogLevel.CRITICAL: logging.CRITICAL,
+}
+
 
 # ---------- Settings ----------
 
@@ -124,20 +140,22 @@ class Settings(BaseSettings):
     )
     @classmethod
     def _coerce_to_path(cls, v):
-        if isinstance(v, Path):
+        if v is None or isinstance(v, Path):
             return v
-        return Path(str(v)) if v is not None else v
-
-    @field_validator("OUTPUT_DIR", "WORKFLOWS_DIR", "STORAGE_STATE_DIR", "TRACE_DIR", mode="after")
-    @classmethod
-    def _absolutize_dirs(cls, v: Path, info):
-        # Make directories relative to CWD absolute for consistency
-        return v if v.is_absolute() else Path.cwd() / v
-
-    @field_validator("LOG_FILE", mode="after")
-    @classmethod
-    def _absolutize_log_file(cls, v: Path, info):
-        return v if v.is_absolute() else Path.cwd() / v
+        return Path(v)
+
+    @model_validator(mode="after")
+    def _absolutize_paths(self):
+        # Make paths relative to CWD absolute for consistency; CWD is read once per build,
+        # and only if some path is actually relative
+        cwd: Optional[Path] = None
+        for name in ("OUTPUT_DIR", "WORKFLOWS_DIR", "STORAGE_STATE_DIR", "TRACE_DIR", "LOG_FILE"):
+            v = getattr(self, name)
+            if not v.is_absolute():
+                if cwd is None:
+                    cwd = Path(os.getcwd())
+                setattr(self, name, cwd / v)
+        return self
 
     # Guard: JPEG requires a quality value
     @field_validator("SCREENSHOT_QUALITY")
@@ -154,8 +172,8 @@ class Settings(BaseSettings):
 
     def ensure_dirs(self) -> None:
         """Create required directories (idempotent)."""
-        for p in {self.OUTPUT_DIR, self.STORAGE_STATE_DIR, self.TRACE_DIR, self.LOG_FILE.parent}:
-            p.mkdir(parents=True, exist_ok=True)
+        for p in (self.OUTPUT_DIR, self.STORAGE_STATE_DIR, self.TRACE_DIR, self.LOG_FILE.parent):
+            ensure_dir(p)
 
     # Convenience: Playwright launch options dict
     def playwright_launch_kwargs(self) -> dict:
@@ -181,19 +199,66 @@ class Settings(BaseSettings):
         return ctx
 
 
+# --------- Directory creation (once per path) ---------
+
+_dirs_ensured: set[str] = set()
+
+
+def ensure_dir(path: Path | str) -> None:
+    """
+    `mkdir -p` each distinct directory at most once per process; later calls for the
+    same path are a set lookup. Empty paths (a bare filename's parent) are ignored.
+    """
+    sp = os.fspath(path)
+    if not sp or sp in _dirs_ensured:
+        return
+    Path(sp).mkdir(parents=True, exist_ok=True)
+    _dirs_ensured.add(sp)
+
+
 # --------- Public accessor (memoized) ---------
 
-@functools.lru_cache(maxsize=1)
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
 def get_settings() -> Settings:
     """
     Load and cache settings once per process.
-    Call `get_settings.cache_clear()` if you need to reload after changing env.
+    Call `reload_settings()` if you need to reload after changing env.
     """
-    s = Settings()
-    s.ensure_dirs()
+    s = _settings
+    if s is None:
+        s = _load_settings()
     return s
 
 
+def _load_settings() -> Settings:
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            s = Settings()
+            s.ensure_dirs()
+            _settings = s
+        return _settings
+
+
+def _clear_settings() -> None:
+    global _settings
+    with _settings_lock:
+        _settings = None
+
+
+def reload_settings() -> Settings:
+    """Drop the cached settings and load them again (e.g. after changing env)."""
+    _clear_settings()
+    return _load_settings()
+
+
+# Kept for callers of the former lru_cache API
+get_settings.cache_clear = _clear_settings  # type: ignore[attr-defined]
+
+
 # --------- Lightweight DTO for other modules (optional) ---------
 
 class Paths(BaseModel):
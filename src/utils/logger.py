@@ -6,14 +6,18 @@ import logging
 import os
 import sys
 import threading
+import time
 from datetime import datetime, timezone
 from logging.handlers import RotatingFileHandler
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, MutableMapping, Optional, Tuple
 
-from rich.console import Console
-from rich.logging import RichHandler
+from src.utils.config import ensure_dir, get_settings, LogLevel
 
-from src.utils.config import get_settings, LogLevel
+try:  # optional: much faster JSON encoding for file logs
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
 
 
 __all__ = [
@@ -31,7 +35,12 @@ __all__ = [
 
 _config_lock = threading.Lock()
 _configured = False
-_global_extra: Dict[str, Any] = {}  # optional global context attached to every record
+# Optional global context attached to every record. Immutable snapshot, swapped wholesale by
+# bind/unbind so adapters and formatters can share it without copying.
+_global_extra: Mapping[str, Any] = MappingProxyType({})
+# Whether a root handler formats JSON, i.e. whether anything reads the injected context.
+# Refreshed whenever this module adds or removes handlers.
+_json_sink = False
 
 
 # ------------- JSON Formatter (for file logs) -------------
@@ -45,10 +54,29 @@ class JsonFormatter(logging.Formatter):
     default_time_format = "%Y-%m-%dT%H:%M:%S"
     default_msec_format = "%s.%03dZ"
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # (second, formatted second): records arrive in bursts, so most reuse the last one
+        self._last_sec: Tuple[int, str] = (-1, "")
+        self._dumps = (
+            _orjson_dumps if orjson is not None
+            else json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        )
+
+    def _utc_ts(self, created: float) -> str:
+        sec = int(created)
+        last = self._last_sec
+        if last[0] == sec:
+            base = last[1]
+        else:
+            base = time.strftime(self.default_time_format, time.gmtime(sec))
+            self._last_sec = (sec, base)
+        return self.default_msec_format % (base, int((created - sec) * 1000))
+
     def format(self, record: logging.LogRecord) -> str:
         # Base structure
         payload: Dict[str, Any] = {
-            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).strftime(self.default_time_format),
+            "ts": self._utc_ts(record.created),
             "level": record.levelname,
             "logger": record.name,
             "msg": record.getMessage(),
@@ -58,27 +86,24 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
 
-        # Merge context (added via LoggerAdapter / extra)
-        if hasattr(record, "extra") and isinstance(record.extra, dict):
-            payload.update(record.extra)
+        # Merge context (added via LoggerAdapter / extra); absent when there is none
+        extra = getattr(record, "extra", None)
+        if extra and isinstance(extra, Mapping):
+            payload.update(extra)
 
         # Add thread/process info (useful in parallel runs)
         payload["thread"] = record.threadName
         payload["process"] = record.process
 
-        return json.dumps(payload, ensure_ascii=False)
+        return self._dumps(payload)
 
 
-# ------------- Helpers -------------
+def _orjson_dumps(payload: Dict[str, Any]) -> str:
+    # Handlers write text, so decode; the output matches the compact stdlib encoding
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
 
-_LEVEL_MAP = {
-    LogLevel.DEBUG: logging.DEBUG,
-    LogLevel.INFO: logging.INFO,
-    LogLevel.WARNING: logging.WARNING,
-    LogLevel.ERROR: logging.ERROR,
-    LogLevel.CRITICAL: logging.CRITICAL,
-}
 
+# ------------- Helpers -------------
 
 def _ensure_configured() -> None:
     """
@@ -94,7 +119,7 @@ def _ensure_configured() -> None:
             return
 
         settings = get_settings()
-        level = _LEVEL_MAP.get(settings.LOG_LEVEL, logging.INFO)
+        level = settings.LOG_LEVEL.py_level
 
         # Always start from a clean slate (avoid duplicate handlers in notebooks / re-runs)
         root = logging.getLogger()
@@ -102,25 +127,32 @@ def _ensure_configured() -> None:
         for h in list(root.handlers):
             root.removeHandler(h)
 
-        # Console handler (Rich)
-        console = Console(stderr=True, force_jupyter=False, color_system="auto")
-        rich_handler = RichHandler(
-            console=console,
-            show_time=True,
-            show_path=False,
-            rich_tracebacks=True,
-            markup=settings.COLORIZED_OUTPUT,
-            omit_repeated_times=False,
-        )
-        # Keep console formatting readable
-        rich_fmt = logging.Formatter("%(message)s")
-        rich_handler.setFormatter(rich_fmt)
-        rich_handler.setLevel(level)
-        root.addHandler(rich_handler)
+        # Console handler: Rich for humans; plain lines (and no rich import) when output is
+        # neither colorized nor going to a terminal, e.g. CI logs or piped CLI output
+        if settings.COLORIZED_OUTPUT or sys.stderr.isatty():
+            from rich.console import Console
+            from rich.logging import RichHandler
+
+            console = Console(stderr=True, force_jupyter=False, color_system="auto")
+            console_handler: logging.Handler = RichHandler(
+                console=console,
+                show_time=True,
+                show_path=False,
+                rich_tracebacks=True,
+                markup=settings.COLORIZED_OUTPUT,
+                omit_repeated_times=False,
+            )
+            # Keep console formatting readable
+            console_handler.setFormatter(logging.Formatter("%(message)s"))
+        else:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        console_handler.setLevel(level)
+        root.addHandler(console_handler)
 
         # Optional rotating file handler (JSON)
         if settings.LOG_TO_FILE:
-            settings.LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            ensure_dir(settings.LOG_FILE.parent)
             file_handler = RotatingFileHandler(
                 filename=str(settings.LOG_FILE),
                 maxBytes=5 * 1024 * 1024,  # 5MB per file
@@ -137,9 +169,26 @@ def _ensure_configured() -> None:
         for n in noisy:
             logging.getLogger(n).setLevel(max(level, logging.WARNING))
 
+        _refresh_json_sink()
         _configured = True
 
 
+def _refresh_json_sink() -> None:
+    global _json_sink
+    _json_sink = any(isinstance(h.formatter, JsonFormatter) for h in logging.getLogger().handlers)
+
+
+class _GlobalContextAdapter(logging.LoggerAdapter):
+    """Injects the *current* `_global_extra` snapshot (if any) at log time, when a JSON handler will use it."""
+
+    def process(self, msg: Any, kwargs: MutableMapping[str, Any]) -> Tuple[Any, MutableMapping[str, Any]]:
+        if _json_sink:
+            ctx = _global_extra
+            if ctx:
+                kwargs["extra"] = {"extra": ctx}
+        return msg, kwargs
+
+
 def get_logger(name: Optional[str] = None) -> logging.LoggerAdapter:
     """
     Get a configured logger wrapped with a LoggerAdapter
@@ -147,35 +196,40 @@ def get_logger(name: Optional[str] = None) -> logging.LoggerAdapter:
     """
     _ensure_configured()
     base = logging.getLogger(name if name else "ui-capture")
-    return logging.LoggerAdapter(base, extra={"extra": _global_extra})
+    return _GlobalContextAdapter(base, None)
 
 
-def set_log_level(level: LogLevel | str) -> None:
+def set_log_level(level: LogLevel | int | str) -> None:
     """
-    Dynamically adjust log level at runtime.
+    Dynamically adjust log level at runtime (LogLevel, stdlib level number, or level name).
     """
     _ensure_configured()
-    lvl = level if isinstance(level, str) else level.value
-    py_level = getattr(logging, lvl.upper(), logging.INFO)
+    if isinstance(level, LogLevel):
+        py_level = level.py_level
+    elif isinstance(level, int):
+        py_level = level
+    else:
+        py_level = getattr(logging, level.upper(), logging.INFO)
     logging.getLogger().setLevel(py_level)
     for h in logging.getLogger().handlers:
         h.setLevel(py_level)
 
-
 def bind(**kwargs: Any) -> None:
     """
     Bind global context (e.g., run_id="2025-10-26_12-00-00", site_key="linear.app").
     Will be attached to every subsequent log line (file JSON + console).
     """
-    _global_extra.update(kwargs)
+    global _global_extra
+    _global_extra = MappingProxyType({**_global_extra, **kwargs})
 
 
 def unbind(*keys: str) -> None:
     """
     Remove keys from global context.
     """
-    for k in keys:
-        _global_extra.pop(k, None)
+    global _global_extra
+    if any(k in _global_extra for k in keys):
+        _global_extra = MappingProxyType({k: v for k, v in _global_extra.items() if k not in keys})
 
 
 def log_with_context(logger: logging.LoggerAdapter, **kwargs: Any):
@@ -186,8 +240,11 @@ def log_with_context(logger: logging.LoggerAdapter, **kwargs: Any):
         with_user = log_with_context(log, user="alice")
         with_user.info("doing stuff")
     """
-    merged = dict(_global_extra)
-    merged.update(kwargs)
+    if not kwargs:
+        return logger
+    # Nested scopes keep the enclosing scope's context (e.g. site/task under a step)
+    parent = logger.extra.get("extra") if isinstance(logger.extra, Mapping) else None
+    merged = {**_global_extra, **(parent or {}), **kwargs}
     return logging.LoggerAdapter(logger.logger, extra={"extra": merged})
 
 
@@ -202,11 +259,12 @@ def attach_file_logger(path: os.PathLike | str, level: Optional[int] = None) ->
     root = logging.getLogger()
     lvl = level if level is not None else root.level
     p = os.fspath(path)
-    os.makedirs(os.path.dirname(p), exist_ok=True)
+    ensure_dir(os.path.dirname(p))
     fh = RotatingFileHandler(filename=p, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8", delay=True)
     fh.setLevel(lvl)
     fh.setFormatter(JsonFormatter())
     root.addHandler(fh)
+    _refresh_json_sink()
     return fh
 
 
@@ -215,6 +273,7 @@ def detach_file_logger(handler: logging.Handler) -> None:
     try:
         root = logging.getLogger()
         root.removeHandler(handler)
+        _refresh_json_sink()
         try:
             handler.close()
         except Exception:
@@ -2,23 +2,29 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import logging
 import math
 import random
 import time
 from dataclasses import dataclass
-from typing import Any, Callable, Iterable, Optional, Type, TypeVar, ParamSpec
+from typing import Any, Awaitable, Callable, Optional, Type, TypeVar, ParamSpec
 
 from src.utils.logger import get_logger
 
 P = ParamSpec("P")
 T = TypeVar("T")
 
+log = get_logger(__name__)
+
+_NS_PER_MS = 1_000_000
+
 
 # ---------------- Monotonic time helpers ----------------
 
 def now_ms() -> int:
     """Monotonic time in milliseconds."""
-    return time.monotonic_ns() // 1_000_000
+    return time.monotonic_ns() // _NS_PER_MS
 
 
 def sleep_ms(ms: int) -> None:
@@ -67,21 +73,36 @@ def exp_backoff_delays_ms(
     factor: float = 2.0,
     max_ms: int = 5000,
     jitter: float = 0.1,
-) -> Iterable[int]:
+) -> tuple[int, ...]:
     """
-    Yield `attempts` backoff delays in ms.
+    Return `attempts` backoff delays in ms.
     Exponential growth with optional jitter (fraction of delay).
     """
-    delay = max(0, initial_ms)
-    for _ in range(max(1, attempts)):
-        jitter_amt = delay * jitter
-        if jitter_amt > 0:
-            delay_j = delay + random.uniform(-jitter_amt, jitter_amt)
-        else:
-            delay_j = delay
-        yield int(min(max_ms, max(0, delay_j)))
-        # next
-        delay = min(max_ms, int(math.ceil(delay * factor)))
+    n = max(1, attempts)
+    out = [0] * n
+    delay = max(0, int(initial_ms))
+    # Integer growth for the usual factors; ceil keeps any other factor from stalling at 1 ms
+    if factor == 2:
+        def step(d: int) -> int:
+            return d << 1
+    elif factor == 1.5:
+        def step(d: int) -> int:
+            return d + ((d + 1) >> 1)
+    else:
+        def step(d: int) -> int:
+            return math.ceil(d * factor)
+    if jitter > 0:
+        # uniform() is C-level; randint() is several pure-Python calls per draw
+        uniform = random.uniform
+        for i in range(n):
+            amt = delay * jitter
+            out[i] = min(max_ms, max(0, delay + int(uniform(-amt, amt))))
+            delay = min(max_ms, step(delay))
+    else:
+        for i in range(n):
+            out[i] = min(max_ms, delay)
+            delay = min(max_ms, step(delay))
+    return tuple(out)
 
 
 # ---------------- Retry (sync) ----------------
@@ -115,45 +136,63 @@ def retry(
     Raises:
         Last caught exception after exhausting retries.
     """
-    log = get_logger(__name__)
     attempts = max(1, tries)
-    last_exc: Optional[BaseException] = None
+    sleep = time.sleep
+    # One delay between each pair of attempts, built on the first failure (most calls never
+    # fail); the last attempt re-raises instead of sleeping
+    delays: tuple[int, ...] = ()
 
-    for attempt, delay in enumerate(exp_backoff_delays_ms(attempts=attempts - 1,
-                                                          initial_ms=initial_delay_ms,
-                                                          factor=factor,
-                                                          max_ms=max_delay_ms,
-                                                          jitter=jitter), start=1):
+    for attempt in range(1, attempts + 1):
         try:
             return fn(*args, **kwargs)
         except exceptions as exc:  # type: ignore[misc]
-            last_exc = exc
-            if attempt >= attempts:
-                break
+            if attempt == attempts:
+                if attempts > 1 and log.logger.isEnabledFor(logging.DEBUG):
+                    # keep a breadcrumb; callers can also log on their side
+                    log.debug("Exhausted retries; last error: %r", exc)
+                raise
             if before_retry:
                 try:
                     before_retry(attempt, exc)
                 except Exception:
                     pass
-            log.debug(f"Retry attempt {attempt}/{attempts-1} after error: {exc!r} (sleep {delay} ms)")
-            sleep_ms(delay)
-
-    # last attempt (no delay)
-    try:
-        return fn(*args, **kwargs)
-    except exceptions as exc:  # type: ignore[misc]
-        raise exc
-    except BaseException:
-        # if a different exception is thrown, propagate it
-        raise
-    finally:
-        if last_exc is not None:
-            # keep a breadcrumb; callers can also log on their side
-            log.debug(f"Exhausted retries; last error: {last_exc!r}")
+            if not delays:
+                delays = exp_backoff_delays_ms(attempts=attempts - 1,
+                                               initial_ms=initial_delay_ms,
+                                               factor=factor,
+                                               max_ms=max_delay_ms,
+                                               jitter=jitter)
+            delay = delays[attempt - 1]
+            if log.logger.isEnabledFor(logging.DEBUG):
+                log.debug("Retry attempt %d/%d after error: %r (sleep %d ms)", attempt, attempts - 1, exc, delay)
+            if delay > 0:
+                sleep(delay / 1000.0)
+
+    raise AssertionError("unreachable")  # pragma: no cover
 
 
 # ---------------- Retry (async) ----------------
 
+def _async_caller(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Callable[[], Awaitable[Any]]:
+    """
+    Decide once how to invoke `fn`: coroutine functions are awaited directly; for plain
+    callables the first result tells whether later results need awaiting too.
+    """
+    if asyncio.iscoroutinefunction(fn):
+        return lambda: fn(*args, **kwargs)
+
+    returns_coro: Optional[bool] = None
+
+    async def call() -> Any:
+        nonlocal returns_coro
+        result = fn(*args, **kwargs)
+        if returns_coro is None:
+            returns_coro = asyncio.iscoroutine(result)
+        return (await result) if returns_coro else result
+
+    return call
+
+
 async def async_retry(
     fn: Callable[P, Any],
     /,
@@ -171,44 +210,40 @@ async def async_retry(
     Async retry with exponential backoff.
     `fn` can be an async callable.
     """
-    log = get_logger(__name__)
     attempts = max(1, tries)
-    last_exc: Optional[BaseException] = None
+    asleep = asyncio.sleep
+    call = _async_caller(fn, args, kwargs)
+    # One delay between each pair of attempts, built on the first failure (most calls never
+    # fail); the last attempt re-raises instead of sleeping
+    delays: tuple[int, ...] = ()
 
-    for attempt, delay in enumerate(exp_backoff_delays_ms(attempts=attempts - 1,
-                                                          initial_ms=initial_delay_ms,
-                                                          factor=factor,
-                                                          max_ms=max_delay_ms,
-                                                          jitter=jitter), start=1):
+    for attempt in range(1, attempts + 1):
         try:
-            result = fn(*args, **kwargs)
-            if asyncio.iscoroutine(result):
-                result = await result
-            return result
+            return await call()
         except exceptions as exc:  # type: ignore[misc]
-            last_exc = exc
-            if attempt >= attempts:
-                break
+            if attempt == attempts:
+                if attempts > 1 and log.logger.isEnabledFor(logging.DEBUG):
+                    # keep a breadcrumb; callers can also log on their side
+                    log.debug("[async] Exhausted retries; last error: %r", exc)
+                raise
             if before_retry:
                 try:
                     before_retry(attempt, exc)
                 except Exception:
                     pass
-            log.debug(f"[async] Retry attempt {attempt}/{attempts-1} after error: {exc!r} (sleep {delay} ms)")
-            await async_sleep_ms(delay)
+            if not delays:
+                delays = exp_backoff_delays_ms(attempts=attempts - 1,
+                                               initial_ms=initial_delay_ms,
+                                               factor=factor,
+                                               max_ms=max_delay_ms,
+                                               jitter=jitter)
+            delay = delays[attempt - 1]
+            if log.logger.isEnabledFor(logging.DEBUG):
+                log.debug("[async] Retry attempt %d/%d after error: %r (sleep %d ms)", attempt, attempts - 1, exc, delay)
+            if delay > 0:
+                await asleep(delay / 1000.0)
 
-    try:
-        result = fn(*args, **kwargs)
-        if asyncio.iscoroutine(result):
-            result = await result
-        return result
-    except exceptions as exc:  # type: ignore[misc]
-        raise exc
-    except BaseException:
-        raise
-    finally:
-        if last_exc is not None:
-            log.debug(f"[async] Exhausted retries; last error: {last_exc!r}")
+    raise AssertionError("unreachable")  # pragma: no cover
 
 
 # ---------------- wait_for (polling) ----------------
@@ -226,21 +261,26 @@ def wait_for(
     Raises:
         TimeoutError on timeout.
     """
-    log = get_logger(__name__)
-    deadline = now_ms() + max(0, timeout_ms)
+    mono, sleep = time.monotonic_ns, time.sleep
+    deadline_ns = mono() + max(0, timeout_ms) * _NS_PER_MS
+    interval_s = max(1, interval_ms) / 1000.0
+    # Optional breadcrumb roughly once a second, only for slow polls
+    crumb_every = max(1, 1000 // interval_ms) if interval_ms >= 500 else 0
+    iters = 0
 
     while True:
         val = predicate()
         if val:
             return val
-        if now_ms() >= deadline:
+        if mono() >= deadline_ns:
             desc = f" ({description})" if description else ""
             raise TimeoutError(f"wait_for timed out after {timeout_ms} ms{desc}")
-        sleep_ms(max(1, interval_ms))
+        sleep(interval_s)
 
-        # Optional: lightweight breadcrumb if long waits
-        if interval_ms >= 500 and (deadline - now_ms()) % 1000 < interval_ms:
-            log.debug(f"Waiting... {max(0, deadline - now_ms())} ms left{(' - ' + description) if description else ''}")
+        iters += 1
+        if crumb_every and iters % crumb_every == 0 and log.logger.isEnabledFor(logging.DEBUG):
+            left_ms = max(0, (deadline_ns - mono()) // _NS_PER_MS)
+            log.debug("Waiting... %d ms left%s", left_ms, f" - {description}" if description else "")
 
 
 async def async_wait_for(
@@ -252,22 +292,27 @@ async def async_wait_for(
     """
     Async variant of wait_for(). `predicate` may be sync or async.
     """
-    log = get_logger(__name__)
-    deadline = now_ms() + max(0, timeout_ms)
+    mono, asleep = time.monotonic_ns, asyncio.sleep
+    deadline_ns = mono() + max(0, timeout_ms) * _NS_PER_MS
+    interval_s = max(1, interval_ms) / 1000.0
+    crumb_every = max(1, 1000 // interval_ms) if interval_ms >= 500 else 0
+    iters = 0
+
+    call = _async_caller(predicate, (), {})
 
     while True:
-        result = predicate()
-        if asyncio.iscoroutine(result):
-            result = await result
+        result = await call()
         if result:
             return result
-        if now_ms() >= deadline:
+        if mono() >= deadline_ns:
             desc = f" ({description})" if description else ""
             raise TimeoutError(f"async_wait_for timed out after {timeout_ms} ms{desc}")
-        await async_sleep_ms(max(1, interval_ms))
+        await asleep(interval_s)
 
-        if interval_ms >= 500 and (deadline - now_ms()) % 1000 < interval_ms:
-            log.debug(f"[async] Waiting... {max(0, deadline - now_ms())} ms left{(' - ' + description) if description else ''}")
+        iters += 1
+        if crumb_every and iters % crumb_every == 0 and log.logger.isEnabledFor(logging.DEBUG):
+            left_ms = max(0, (deadline_ns - mono()) // _NS_PER_MS)
+            log.debug("[async] Waiting... %d ms left%s", left_ms, f" - {description}" if description else "")
 
 
 # ---------------- measure decorator ----------------
@@ -280,18 +325,23 @@ def measure(label: str = "", level: str = "INFO") -> Callable[[Callable[P, T]],
         def open_modal(...): ...
     """
     level = level.upper()
-    log = get_logger(__name__)
     log_fn = getattr(log, level.lower(), log.info)
 
+    mono = time.monotonic_ns
+
     def decorator(func: Callable[P, T]) -> Callable[P, T]:
+        name = label or func.__name__
+
+        @functools.wraps(func)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            with Stopwatch() as sw:
-                try:
-                    return func(*args, **kwargs)
-                finally:
-                    ms = sw.elapsed_ms()
-                    human = f"{ms} ms" if ms < 1000 else f"{ms/1000:.3f} s"
-                    name = label or func.__name__
-                    log_fn(f"{name} took {human}")
+            t0 = mono()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ms = (mono() - t0) // _NS_PER_MS
+                if ms < 1000:
+                    log_fn("%s took %d ms", name, ms)
+                else:
+                    log_fn("%s took %.3f s", name, ms / 1000)
         return wrapper
     return decorator
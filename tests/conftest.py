@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+
+from src.utils.config import reload_settings
+
+_PATH_VARS = {
+    "OUTPUT_DIR": "out",
+    "WORKFLOWS_DIR": "workflows",
+    "STORAGE_STATE_DIR": "storage_state",
+    "TRACE_DIR": "traces",
+    "LOG_FILE": "ui-capture.log",
+}
+_saved_env: dict[str, str | None] = {}
+_tmp_root: str | None = None
+
+
+def pytest_configure(config):
+    """
+    Point every settings path at a temp dir before collection, so importing src modules
+    (whose module-level loggers load settings once) never touches the working tree.
+    """
+    global _tmp_root
+    _tmp_root = tempfile.mkdtemp(prefix="ui-capture-tests-")
+    for var, name in _PATH_VARS.items():
+        _saved_env[var] = os.environ.get(var)
+        os.environ[var] = os.path.join(_tmp_root, name)
+    reload_settings()
+
+
+def pytest_unconfigure(config):
+    for var, old in _saved_env.items():
+        if old is None:
+            os.environ.pop(var, None)
+        else:
+            os.environ[var] = old
+    if _tmp_root:
+        shutil.rmtree(_tmp_root, ignore_errors=True)
@@ -0,0 +1,46 @@
+import pytest
+
+from src.detection.modal_detector import ModalDetector
+from src.detection.overlay_detector import OverlayDetector
+
+
+@pytest.fixture(scope="module")
+def browser():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    pw = sync_api.sync_playwright().start()
+    try:
+        b = pw.chromium.launch()
+    except Exception as e:  # browsers not installed in this environment
+        pw.stop()
+        pytest.skip(f"chromium unavailable: {e}")
+    yield b
+    b.close()
+    pw.stop()
+
+
+@pytest.fixture
+def page(browser):
+    p = browser.new_page(viewport={"width": 1000, "height": 800})
+    yield p
+    p.close()
+
+
+def test_portal_dialog_after_many_hidden_matches_is_detected(page):
+    # More hidden candidates than MAX_CANDIDATES ahead of a portal mounted at the end of <body>
+    hidden = "".join(
+        '<div class="modal" style="display:none"></div><div class="overlay" hidden></div>'
+        for _ in range(60)
+    )
+    page.set_content(
+        f"<body>{hidden}"
+        '<div id="backdrop" class="overlay" style="position:fixed;inset:0;background:rgba(0,0,0,.5);z-index:40"></div>'
+        '<div id="portal" role="dialog" style="position:fixed;left:300px;top:200px;width:400px;height:300px;'
+        'background:#fff;z-index:50">Hi</div></body>'
+    )
+
+    modal = ModalDetector().detect_active(page)
+    assert modal is not None and modal.selector_hint.startswith("div#portal")
+    assert modal.locator.get_attribute("id") == "portal"
+
+    overlay = OverlayDetector().detect(page)
+    assert overlay is not None and overlay.locator.get_attribute("id") == "backdrop"
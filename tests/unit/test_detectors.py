@@ -0,0 +1,89 @@
+from src.detection.modal_detector import ModalDetector
+from src.detection.overlay_detector import OverlayDetector
+
+
+class FakeLocator:
+    def __init__(self, selector: str, index: int = -1, page=None):
+        self.selector = selector
+        self.index = index
+        self.page = page
+
+    def nth(self, i: int) -> "FakeLocator":
+        return FakeLocator(self.selector, i, self.page)
+
+    def evaluate_all(self, script, arg):
+        self.page.pierced += 1
+        return self.page.pierced_result
+
+
+class FakePage:
+    """Returns canned helper results; records how many helper round-trips were made."""
+
+    def __init__(self, result, pierced_result=None):
+        self.result = result
+        self.pierced_result = pierced_result
+        self.init_scripts = []
+        self.helper_calls = 0
+        self.pierced = 0
+
+    def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+    def evaluate(self, script, arg=None):
+        if arg is None:
+            return None  # helper bundle install
+        self.helper_calls += 1
+        return {"value": self.result}
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(selector, page=self)
+
+
+def _scan(*cands):
+    """Pack (i, z, extra) candidates into the flat {hints, nums} payload the page scans return."""
+    hints, nums = [], []
+    for i, z, extra in cands:
+        hints.append(f"div.c{i}")
+        nums += [i, z, 1.4, 2, 300, 200, extra]
+    return {"hints": hints, "nums": nums}
+
+
+def test_modal_detect_active_picks_highest_z_in_one_round_trip():
+    page = FakePage(_scan((0, 10, 0), (3, 1050, 1), (5, 20, 0)))
+    detector = ModalDetector()
+    info = detector.detect_active(page)
+    assert page.helper_calls == 1
+    assert info.z_index == 1050 and info.has_backdrop
+    assert info.locator.index == 3
+    assert info.bbox == (1, 2, 300, 200)
+
+    # Helpers are installed once per page, later scans only call them
+    detector.find_all(page)
+    assert len(page.init_scripts) == 1 and page.helper_calls == 2
+
+
+def test_scans_defer_to_playwright_matches_on_shadow_pages():
+    # The in-page scan reports open shadow roots; indexes then come from Playwright's enumeration
+    page = FakePage({"pierce": True}, pierced_result=_scan((2, 30, 1)))
+    info = ModalDetector().detect_active(page)
+    assert page.pierced == 1 and info.locator.index == 2 and info.z_index == 30
+
+    page = FakePage({"pierce": True}, pierced_result=_scan((4, 7, 0.5)))
+    assert OverlayDetector().detect(page).locator.index == 4
+
+
+def test_modal_detect_active_none_when_no_candidates():
+    assert ModalDetector().detect_active(FakePage(_scan())) is None
+
+
+def test_overlay_find_all_sorted_by_z_then_area():
+    page = FakePage(_scan((0, 5, 0.5), (1, 100, 0.3)))
+    overlays = OverlayDetector().find_all(page)
+    assert [o.z_index for o in overlays] == [100, 5]
+    assert overlays[0].locator.index == 1
+
+
+def test_overlay_detect_returns_top_ranked_only():
+    page = FakePage(_scan((0, 100, 0.3), (1, 100, 0.9), (2, 5, 1.0)))
+    top = OverlayDetector().detect(page)
+    assert top.locator.index == 1 and top.opacity == 0.9
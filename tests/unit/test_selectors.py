@@ -0,0 +1,124 @@
+import gc
+import weakref
+
+import pytest
+
+from src.core.workflow_loader import Selector
+from src.selectors.locator import resolve_locator
+from src.selectors.strategy import LocatorStrategy, SelectorNotFound
+
+
+class FakeLocator:
+    def __init__(self, page, selector: str):
+        self.page = page
+        self.selector = selector
+        self.waited = False
+
+    @property
+    def first(self) -> "FakeLocator":
+        return self
+
+    def count(self) -> int:
+        self.page.pw_calls += 1
+        return 1 if self.selector in self.page.matches else 0
+
+    def is_visible(self) -> bool:
+        self.page.pw_calls += 1
+        return self.page.matches.get(self.selector, False)
+
+    def wait_for(self, state: str, timeout: int) -> None:
+        self.waited = True
+
+    def click(self) -> None:
+        self.page.clicks += 1
+        if self.page.clicks < 2:
+            raise RuntimeError("detached")
+
+
+class FakePage:
+    """`probe` is the canned probeSelectors result; `matches` maps selector -> visible for Playwright checks."""
+
+    def __init__(self, probe, matches=None):
+        self.probe = probe
+        self.matches = matches or {}
+        self.helper_calls = 0
+        self.pw_calls = 0
+        self.clicks = 0
+        self.closed = False
+        self.close_handlers = []
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    def once(self, event: str, handler) -> None:
+        assert event == "close"
+        self.close_handlers.append(handler)
+
+    def close(self) -> None:
+        self.closed = True
+        for handler in self.close_handlers:
+            handler(self)
+
+    def add_init_script(self, script):
+        pass
+
+    def evaluate(self, script, arg=None):
+        if arg is None:
+            return None
+        self.helper_calls += 1
+        return {"value": self.probe}
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(self, selector)
+
+    def get_by_text(self, text: str, exact: bool = False) -> FakeLocator:
+        return FakeLocator(self, f"text:{text}")
+
+
+def test_choose_takes_first_visible_from_single_probe():
+    page = FakePage([0, 1, 2])
+    sels = [Selector(".a"), Selector(".b"), Selector("//c", strategy="xpath")]
+    chosen = LocatorStrategy(page).choose(sels)
+    assert (chosen.index, chosen.how) == (2, "visible")
+    assert page.helper_calls == 1 and page.pw_calls == 0
+
+
+def test_choose_falls_back_to_playwright_for_unprobed_selectors():
+    page = FakePage([0, None, 2], matches={"text:Save": True})
+    sels = [Selector(".a"), Selector("Save", strategy="text"), Selector(".c")]
+    chosen = LocatorStrategy(page).choose(sels)
+    # Order is preserved: the text selector ahead of .c wins once Playwright confirms it
+    assert (chosen.index, chosen.how) == (1, "visible")
+    assert page.pw_calls == 2
+
+
+def test_choose_waits_on_first_present_then_raises_when_nothing_matches():
+    page = FakePage([1, 1])
+    chosen = LocatorStrategy(page).choose([Selector(".a"), Selector(".b")])
+    assert (chosen.index, chosen.how) == (0, "state-wait") and chosen.locator.waited
+
+    with pytest.raises(SelectorNotFound):
+        LocatorStrategy(FakePage([0, 0])).choose([Selector(".a"), Selector(".b")])
+
+
+def test_click_retries_only_the_action():
+    page = FakePage([2])
+    chosen = LocatorStrategy(page).click([Selector(".a")], retries=2)
+    assert chosen.index == 0
+    assert page.clicks == 2 and page.helper_calls == 1
+
+
+def test_locator_cache_is_dropped_on_close_and_never_pins_pages():
+    page = FakePage([])
+    loc = resolve_locator(page, Selector(".a"))
+    assert resolve_locator(page, Selector(".a")) is loc
+    page.close()
+    assert resolve_locator(page, Selector(".a")) is not loc
+
+    # Cached locators reference their page; the page must still be collectable
+    other = FakePage([])
+    resolve_locator(other, Selector(".a"))
+    ref = weakref.ref(other)
+    del other, loc
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,83 @@
+import logging
+import os
+
+import pytest
+
+from src.utils.config import get_settings
+from src.utils.logger import attach_file_logger, detach_file_logger, get_logger, log_with_context
+from src.utils.timing import async_retry, retry
+
+
+def test_playwright_kwargs_follow_copied_settings():
+    s = get_settings()
+    base = s.playwright_context_kwargs()
+    wide = s.model_copy(update={"VIEWPORT_WIDTH": 999})
+    assert wide.playwright_context_kwargs()["viewport"]["width"] == 999
+    assert s.playwright_context_kwargs() == base
+    # Memoized kwargs never show up among the dumped fields
+    assert not [k for k in s.__dict__ if k.startswith("_")]
+
+
+class Flaky:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError(f"boom {self.calls}")
+        return "ok"
+
+
+@pytest.fixture
+def debug_logs(caplog):
+    caplog.set_level(logging.DEBUG)
+    return caplog
+
+
+def test_retry_single_try_calls_once():
+    fn = Flaky(failures=1)
+    with pytest.raises(RuntimeError, match="boom 1"):
+        retry(fn, tries=1, initial_delay_ms=0)
+    assert fn.calls == 1
+
+
+def test_retry_success_on_last_attempt_is_not_exhausted(debug_logs):
+    fn = Flaky(failures=2)
+    assert retry(fn, tries=3, initial_delay_ms=0, jitter=0) == "ok"
+    assert fn.calls == 3
+    assert "Exhausted" not in debug_logs.text
+
+    with pytest.raises(RuntimeError, match="boom 2"):
+        retry(Flaky(failures=2), tries=2, initial_delay_ms=0, jitter=0)
+    assert "Exhausted retries" in debug_logs.text
+
+
+async def test_async_retry_single_try_calls_once():
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await async_retry(fn, tries=1, initial_delay_ms=0)
+    assert calls == 1
+
+
+def test_nested_log_with_context_keeps_outer_scope():
+    step = log_with_context(log_with_context(get_logger("t"), site="s", task="t"), step=2)
+    assert step.extra["extra"].items() >= {"site": "s", "task": "t", "step": 2}.items()
+
+
+def test_attach_file_logger_accepts_bare_filename(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    handler = attach_file_logger("bare.log")
+    try:
+        get_logger("t").warning("hello")
+        handler.flush()
+    finally:
+        detach_file_logger(handler)
+    assert os.path.exists(tmp_path / "bare.log")
@@ -1,7 +1,9 @@
 from pathlib import Path
 import textwrap
 
-from src.core.workflow_loader import load_workflows_file
+import pytest
+
+from src.core.workflow_loader import Workflow, load_workflows_file
 
 
 def test_load_workflows_file_multiple_docs(tmp_path: Path):
@@ -30,3 +32,105 @@ def test_load_workflows_file_multiple_docs(tmp_path: Path):
     assert workflows[0].site == "example.com" and workflows[0].task == "do_one"
     assert workflows[1].site == "example.com" and workflows[1].task == "do_two"
 
+
+def test_load_workflows_file_normalizes_legacy_docs(tmp_path: Path):
+    yml = textwrap.dedent(
+        """
+        steps:
+          - action: navigate
+            url: "https://example.com/legacy"
+            screenshot: home
+        ---
+        version: "1"
+        site: example.com
+        task: modern
+        steps:
+          - action: goto
+            url: "https://example.com/modern"
+        """
+    )
+    site_dir = tmp_path / "example.com"
+    site_dir.mkdir()
+    f = site_dir / "legacy.yaml"
+    f.write_text(yml, encoding="utf-8")
+
+    workflows = load_workflows_file(f)
+    assert [wf.task for wf in workflows] == ["legacy", "modern"]
+    assert workflows[0].site == "example.com"
+    assert [s.action.value for s in workflows[0].steps] == ["goto", "screenshot"]
+
+
+def test_load_workflows_file_substitutes_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("UI_CAPTURE_TEST_HOST", "env.example.com")
+    yml = textwrap.dedent(
+        """
+        version: "1"
+        site: example.com
+        task: env
+        description: "${UI_CAPTURE_TEST_MISSING}"
+        steps:
+          - action: goto
+            url: "https://${UI_CAPTURE_TEST_HOST}/path"
+        """
+    )
+    f = tmp_path / "env.yaml"
+    f.write_text(yml, encoding="utf-8")
+
+    wf = load_workflows_file(f)[0]
+    assert wf.steps[0].url == "https://env.example.com/path"
+    # Unknown variables are left untouched
+    assert wf.description == "${UI_CAPTURE_TEST_MISSING}"
+
+
+def test_workflow_json_roundtrip(tmp_path: Path):
+    yml = textwrap.dedent(
+        """
+        version: "1"
+        site: example.com
+        task: roundtrip
+        output_dir: out
+        steps:
+          - action: goto
+            url: "https://example.com/"
+          - action: click
+            selector:
+              value: "button|Create"
+              strategy: role
+          - action: set_input_files
+            selector:
+              value: "input[type=file]"
+            files: ["fixtures/a.png"]
+        """
+    )
+    f = tmp_path / "rt.yaml"
+    f.write_text(yml, encoding="utf-8")
+    wf = load_workflows_file(f)[0]
+
+    # Path fields must survive JSON-mode validation (str -> Path before absolutizing)
+    reloaded = Workflow.model_validate_json(wf.model_dump_json())
+    assert (reloaded.site, reloaded.task) == (wf.site, wf.task)
+    assert reloaded.steps == wf.steps
+    assert reloaded.output_dir == wf.output_dir and reloaded.output_dir.is_absolute()
+
+
+def test_selector_ignores_unknown_keys_and_rejects_fractional_timeout(tmp_path: Path):
+    def load(timeout: str):
+        f = tmp_path / "sel.yaml"
+        f.write_text(textwrap.dedent(
+            f"""
+            site: example.com
+            task: sel
+            steps:
+              - action: click
+                selector:
+                  value: "#go"
+                  timeout_ms: {timeout}
+                  note: "legacy key"
+            """
+        ), encoding="utf-8")
+        return load_workflows_file(f)[0]
+
+    assert load("1500").steps[0].selector.timeout_ms == 1500
+    for bad in ("1.7", "true"):
+        with pytest.raises(ValueError, match="timeout_ms"):
+            load(bad)